@@ -1,97 +1,188 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional, Tuple
 
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
+from botocore.exceptions import BotoCoreError, ClientError, WaiterError
+
+from . import cache
+
+if TYPE_CHECKING:
+    import boto3
+
+# boto3 and botocore.config are imported on first use rather than here: they
+# dominate import time, and commands like `cmm --help` never touch AWS.
+
+# botocore Config shared by every client built through AwsContext.client.
+# Short timeouts fail fast instead of hanging on a dead socket for botocore's
+# default 60 s, adaptive retries back off under throttling, and the pool is
+# large enough for the concurrent S3 calls in list_s3_buckets and
+# deallocate_s3_bucket.
+_CLIENT_CONFIG: Dict[str, Any] = {
+    "connect_timeout": 3,
+    "read_timeout": 10,
+    "retries": {"mode": "adaptive", "max_attempts": 5},
+    "tcp_keepalive": True,
+    "max_pool_connections": 50,
+}
 
 
 @dataclass
 class AwsContext:
     session: boto3.session.Session
     region_name: Optional[str]
+    use_cache: bool = True
+    refresh: bool = False
+    cache_ttl: float = cache.DEFAULT_TTL
+    _clients: Dict[str, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _identity: Optional[Tuple[Optional[str], Optional[str]]] = field(default=None, init=False, repr=False, compare=False)
+
+    def client(self, service: str) -> Any:
+        # Building a client loads and parses the service model, so do it once
+        # per service. Session.client is not thread-safe, hence the lock.
+        with self._lock:
+            cl = self._clients.get(service)
+            if cl is None:
+                from botocore.config import Config
+
+                cl = self.session.client(service, config=Config(**_CLIENT_CONFIG))
+                self._clients[service] = cl
+            return cl
+
+    def prewarm(self, services: Iterable[str]) -> None:
+        # Build clients up front on the calling thread so that worker threads
+        # don't take the first-use service model load under contention.
+        # Failures (e.g. no region configured) are left for the worker's own
+        # client() call to raise, where they are reported per service.
+        for service in services:
+            try:
+                self.client(service)
+            except Exception:
+                pass
 
     @staticmethod
-    def from_profile(profile: Optional[str], region: Optional[str]) -> "AwsContext":
+    def from_profile(
+        profile: Optional[str],
+        region: Optional[str],
+        use_cache: bool = True,
+        refresh: bool = False,
+    ) -> "AwsContext":
+        import boto3
+
         if profile:
             session = boto3.Session(profile_name=profile, region_name=region)
         else:
             session = boto3.Session(region_name=region)
-        return AwsContext(session=session, region_name=region or session.region_name)
-
-
-def list_ec2_instances(ctx: AwsContext) -> List[Dict]:
-    ec2 = ctx.session.client("ec2")
-    reservations = ec2.describe_instances().get("Reservations", [])
-    instances: List[Dict] = []
-    for res in reservations:
-        for inst in res.get("Instances", []):
-            name_tag = next((t["Value"] for t in inst.get("Tags", []) if t.get("Key") == "Name"), "")
-            instances.append(
-                {
-                    "InstanceId": inst.get("InstanceId"),
-                    "InstanceType": inst.get("InstanceType"),
-                    "State": inst.get("State", {}).get("Name"),
-                    "Name": name_tag,
-                    "AZ": inst.get("Placement", {}).get("AvailabilityZone"),
-                    "LaunchTime": inst.get("LaunchTime"),
-                }
-            )
-    return instances
+        return AwsContext(
+            session=session,
+            region_name=region or session.region_name,
+            use_cache=use_cache,
+            refresh=refresh,
+        )
+
+    def cache_identity(self) -> Tuple[Optional[str], Optional[str]]:
+        # A named profile identifies the account by itself; its credentials
+        # may be temporary (assume-role, SSO) and get a new access key every
+        # run, so they stay out of the key. Environment and default
+        # credentials all report the profile "default", so for those the
+        # access key id keeps different accounts apart.
+        with self._lock:
+            if self._identity is None:
+                profile = self.session.profile_name
+                if profile != "default":
+                    self._identity = (profile, None)
+                else:
+                    creds = self.session.get_credentials()
+                    self._identity = (profile, creds.access_key if creds else None)
+            return self._identity
 
+    def invalidate_cache(self) -> None:
+        cache.invalidate(self.cache_identity(), self.region_name)
 
+
+ACTIVE_EC2_STATES: Tuple[str, ...] = ("pending", "running", "stopping", "stopped")
+
+# JMESPath projections applied to each result page; they flatten the responses
+# into the row dicts the CLI renders.
+_EC2_INSTANCE_FIELDS = (
+    "Reservations[].Instances[].{"
+    "InstanceId: InstanceId, "
+    "InstanceType: InstanceType, "
+    "State: State.Name, "
+    "Name: Tags[?Key=='Name'] | [0].Value, "
+    "AZ: Placement.AvailabilityZone, "
+    "LaunchTime: LaunchTime}"
+)
+_RDS_INSTANCE_FIELDS = (
+    "DBInstances[].{"
+    "DBInstanceIdentifier: DBInstanceIdentifier, "
+    "DBInstanceClass: DBInstanceClass, "
+    "Engine: Engine, "
+    "Status: DBInstanceStatus, "
+    "MultiAZ: MultiAZ}"
+)
+_LAMBDA_FUNCTION_FIELDS = (
+    "Functions[].{"
+    "FunctionName: FunctionName, "
+    "Runtime: Runtime, "
+    "LastModified: LastModified}"
+)
+
+
+@cache.cached
+def list_ec2_instances(ctx: AwsContext, states: Optional[Iterable[str]] = ACTIVE_EC2_STATES) -> List[Dict]:
+    # states=None lists instances in every state, including terminated ones
+    ec2 = ctx.client("ec2")
+    params: Dict = {"PaginationConfig": {"PageSize": 1000}}
+    if states is not None:
+        params["Filters"] = [{"Name": "instance-state-name", "Values": list(states)}]
+    pages = ec2.get_paginator("describe_instances").paginate(**params)
+    return list(pages.search(_EC2_INSTANCE_FIELDS))
+
+
+def _bucket_region(s3, name: str) -> str:
+    try:
+        return s3.get_bucket_location(Bucket=name).get("LocationConstraint") or "us-east-1"
+    except (ClientError, BotoCoreError):
+        return "unknown"
+
+
+@cache.cached
 def list_s3_buckets(ctx: AwsContext) -> List[Dict]:
-    s3 = ctx.session.client("s3")
+    s3 = ctx.client("s3")
     buckets = s3.list_buckets().get("Buckets", [])
-    results: List[Dict] = []
-    for b in buckets:
-        name = b.get("Name")
-        try:
-            loc = s3.get_bucket_location(Bucket=name).get("LocationConstraint") or "us-east-1"
-        except (ClientError, BotoCoreError):
-            loc = "unknown"
-        results.append({"Name": name, "CreationDate": b.get("CreationDate"), "Region": loc})
-    return results
+    # get_bucket_location is one round-trip per bucket; issue them concurrently
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        regions = list(pool.map(lambda b: _bucket_region(s3, b.get("Name")), buckets))
+    return [
+        {"Name": b.get("Name"), "CreationDate": b.get("CreationDate"), "Region": loc}
+        for b, loc in zip(buckets, regions)
+    ]
 
 
+@cache.cached
 def list_rds_instances(ctx: AwsContext) -> List[Dict]:
-    rds = ctx.session.client("rds")
-    resp = rds.describe_db_instances()
-    results: List[Dict] = []
-    for db in resp.get("DBInstances", []):
-        results.append(
-            {
-                "DBInstanceIdentifier": db.get("DBInstanceIdentifier"),
-                "DBInstanceClass": db.get("DBInstanceClass"),
-                "Engine": db.get("Engine"),
-                "Status": db.get("DBInstanceStatus"),
-                "MultiAZ": db.get("MultiAZ"),
-            }
-        )
-    return results
+    rds = ctx.client("rds")
+    pages = rds.get_paginator("describe_db_instances").paginate(PaginationConfig={"PageSize": 100})
+    return list(pages.search(_RDS_INSTANCE_FIELDS))
 
 
+@cache.cached
 def list_lambda_functions(ctx: AwsContext) -> List[Dict]:
-    lam = ctx.session.client("lambda")
-    paginator = lam.get_paginator("list_functions")
-    results: List[Dict] = []
-    for page in paginator.paginate():
-        for fn in page.get("Functions", []):
-            results.append(
-                {
-                    "FunctionName": fn.get("FunctionName"),
-                    "Runtime": fn.get("Runtime"),
-                    "LastModified": fn.get("LastModified"),
-                }
-            )
-    return results
+    lam = ctx.client("lambda")
+    pages = lam.get_paginator("list_functions").paginate()
+    return list(pages.search(_LAMBDA_FUNCTION_FIELDS))
 
 
 def get_month_cost(ctx: AwsContext) -> Tuple[str, str]:
     # returns (amount, currency)
-    ce = ctx.session.client("ce")
+    ce = ctx.client("ce")
     start = date.today().replace(day=1).isoformat()
     end = date.today().isoformat()
     resp = ce.get_cost_and_usage(
@@ -108,7 +199,7 @@ def get_month_cost(ctx: AwsContext) -> Tuple[str, str]:
 
 def get_top_usage(ctx: AwsContext, top_n: int = 10) -> List[Tuple[str, float, str]]:
     # returns list of (service, amount, unit)
-    ce = ctx.session.client("ce")
+    ce = ctx.client("ce")
     start = date.today().replace(day=1).isoformat()
     end = date.today().isoformat()
     resp = ce.get_cost_and_usage(
@@ -138,7 +229,7 @@ def allocate_ec2_instance(
     count: int,
     name_tag: Optional[str],
 ) -> List[str]:
-    ec2 = ctx.session.client("ec2")
+    ec2 = ctx.client("ec2")
     params: Dict = {
         "ImageId": ami_id,
         "InstanceType": instance_type,
@@ -159,6 +250,7 @@ def allocate_ec2_instance(
             }
         ]
     resp = ec2.run_instances(**params)
+    ctx.invalidate_cache()
     ids = [i["InstanceId"] for i in resp.get("Instances", [])]
     return ids
 
@@ -166,7 +258,8 @@ def allocate_ec2_instance(
 def deallocate_ec2_instances(
     ctx: AwsContext, instance_ids: List[str], terminate: bool = True
 ) -> List[str]:
-    ec2 = ctx.session.client("ec2")
+    ec2 = ctx.client("ec2")
+    ctx.invalidate_cache()
     if terminate:
         resp = ec2.terminate_instances(InstanceIds=instance_ids)
         return [i.get("InstanceId") for i in resp.get("TerminatingInstances", [])]
@@ -176,7 +269,8 @@ def deallocate_ec2_instances(
 
 
 def allocate_s3_bucket(ctx: AwsContext, bucket_name: str) -> None:
-    s3 = ctx.session.client("s3")
+    s3 = ctx.client("s3")
+    ctx.invalidate_cache()
     region = ctx.region_name
     if region and region != "us-east-1":
         s3.create_bucket(
@@ -187,28 +281,72 @@ def allocate_s3_bucket(ctx: AwsContext, bucket_name: str) -> None:
         s3.create_bucket(Bucket=bucket_name)
 
 
+def _delete_object_batch(s3, bucket_name: str, objects: List[Dict]) -> None:
+    resp = s3.delete_objects(Bucket=bucket_name, Delete={"Objects": objects, "Quiet": True})
+    # Quiet mode still reports per-key failures, inside a successful response
+    errors = resp.get("Errors")
+    if errors:
+        err = errors[0]
+        raise ClientError(
+            {"Error": {"Code": err.get("Code"), "Message": f"{err.get('Key')}: {err.get('Message')}"}},
+            "DeleteObjects",
+        )
+
+
 def deallocate_s3_bucket(ctx: AwsContext, bucket_name: str, force: bool) -> None:
-    s3r = ctx.session.resource("s3")
-    bucket = s3r.Bucket(bucket_name)
+    s3 = ctx.client("s3")
+    ctx.invalidate_cache()
     if force:
-        bucket.objects.all().delete()
-        # delete versions if versioned
-        bucket.object_versions.all().delete()
-    bucket.delete()
+        # list_object_versions also reports plain objects (VersionId "null") in
+        # unversioned buckets, and a page holds at most 1000 versions plus
+        # delete markers, which is exactly one delete_objects batch.
+        pages = s3.get_paginator("list_object_versions").paginate(Bucket=bucket_name)
+        workers = 10
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending: Deque[Future] = deque()
+            for page in pages:
+                objects = [
+                    {"Key": v["Key"], "VersionId": v["VersionId"]}
+                    for v in page.get("Versions", []) + page.get("DeleteMarkers", [])
+                ]
+                if not objects:
+                    continue
+                # listing outpaces deleting; cap queued batches so memory stays
+                # bounded by a few pages rather than the whole bucket
+                while pending and (pending[0].done() or len(pending) >= 2 * workers):
+                    pending.popleft().result()
+                pending.append(pool.submit(_delete_object_batch, s3, bucket_name, objects))
+            for f in pending:
+                f.result()
+    s3.delete_bucket(Bucket=bucket_name)
 
 
-def ensure_stack(ctx: AwsContext, stack_name: str, template_body: str, parameters: Dict[str, str], capabilities: List[str]) -> str:
-    cf = ctx.session.client("cloudformation")
-    param_list = [{"ParameterKey": k, "ParameterValue": v} for k, v in parameters.items()]
-    # Detect if stack exists
+def _stack_exists(cf, stack_name: str) -> bool:
     try:
         cf.describe_stacks(StackName=stack_name)
-        action = "update"
+        return True
     except ClientError as e:
-        if "does not exist" in str(e):
-            action = "create"
-        else:
-            raise
+        err = e.response.get("Error", {})
+        if err.get("Code") == "ValidationError" and "does not exist" in err.get("Message", ""):
+            return False
+        raise
+
+
+# Poll every 5 s instead of botocore's 30 s, keeping its 60 minute ceiling
+_STACK_WAITER_CONFIG = {"Delay": 5, "MaxAttempts": 720}
+
+
+def ensure_stack(
+    ctx: AwsContext,
+    stack_name: str,
+    template_body: str,
+    parameters: Dict[str, str],
+    capabilities: List[str],
+) -> str:
+    cf = ctx.client("cloudformation")
+    ctx.invalidate_cache()
+    param_list = [{"ParameterKey": k, "ParameterValue": v} for k, v in parameters.items()]
+    action = "update" if _stack_exists(cf, stack_name) else "create"
 
     if action == "create":
         resp = cf.create_stack(
@@ -217,22 +355,39 @@ def ensure_stack(ctx: AwsContext, stack_name: str, template_body: str, parameter
             Parameters=param_list,
             Capabilities=capabilities or [],
         )
-        cf.get_waiter("stack_create_complete").wait(StackName=stack_name)
+        cf.get_waiter("stack_create_complete").wait(StackName=stack_name, WaiterConfig=_STACK_WAITER_CONFIG)
         return resp["StackId"]
     else:
+        # Go through a change set so an update with nothing to change is
+        # detected from the change set itself instead of an update_stack error.
+        resp = cf.create_change_set(
+            StackName=stack_name,
+            ChangeSetName=f"cmm-{uuid.uuid4().hex}",
+            ChangeSetType="UPDATE",
+            TemplateBody=template_body,
+            Parameters=param_list,
+            Capabilities=capabilities or [],
+        )
+        change_set_id = resp["Id"]
         try:
-            resp = cf.update_stack(
-                StackName=stack_name,
-                TemplateBody=template_body,
-                Parameters=param_list,
-                Capabilities=capabilities or [],
+            cf.get_waiter("change_set_create_complete").wait(
+                ChangeSetName=change_set_id, WaiterConfig=_STACK_WAITER_CONFIG
             )
-            cf.get_waiter("stack_update_complete").wait(StackName=stack_name)
-            return resp["StackId"]
-        except ClientError as e:
-            if "No updates are to be performed" in str(e):
-                # Return the existing stack id
-                desc = cf.describe_stacks(StackName=stack_name)
-                return desc["Stacks"][0]["StackId"]
-            raise
-
+        except WaiterError as e:
+            # the waiter's last poll is already the parsed describe_change_set response
+            desc = e.last_response or cf.describe_change_set(ChangeSetName=change_set_id)
+            if desc.get("Status") != "FAILED":
+                raise
+            # a failed change set is left on the stack unless removed
+            cf.delete_change_set(ChangeSetName=change_set_id)
+            reason = desc.get("StatusReason", "")
+            if "didn't contain changes" in reason or "No updates are to be performed" in reason:
+                return resp["StackId"]
+            raise WaiterError(
+                name="ChangeSetCreateComplete",
+                reason=f"change set failed: {reason or 'no reason given'}",
+                last_response=desc,
+            ) from e
+        cf.execute_change_set(ChangeSetName=change_set_id)
+        cf.get_waiter("stack_update_complete").wait(StackName=stack_name, WaiterConfig=_STACK_WAITER_CONFIG)
+        return resp["StackId"]
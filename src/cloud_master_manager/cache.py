@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_TTL = 60.0
+
+
+def cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "cmm"
+
+
+def _scope(identity: Any, region: Optional[str]) -> str:
+    return hashlib.sha1(repr((identity, region)).encode("utf-8")).hexdigest()[:16]
+
+
+def _path(identity: Any, region: Optional[str], key: Any) -> Path:
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return cache_dir() / f"{_scope(identity, region)}-{digest}.pkl"
+
+
+def load(identity: Any, region: Optional[str], key: Any, ttl: float) -> Any:
+    # returns None on miss, expiry, or an unreadable entry
+    path = _path(identity, region, key)
+    try:
+        if time.time() - path.stat().st_mtime > ttl:
+            return None
+        with path.open("rb") as fh:
+            return pickle.load(fh)
+    except (OSError, pickle.PickleError, EOFError):
+        return None
+
+
+def _sweep(directory: Path, ttl: float) -> None:
+    # drop expired entries (and temp files left by interrupted writes) so the
+    # cache directory doesn't grow without bound
+    cutoff = time.time() - ttl
+    for pattern in ("*.pkl", "*.tmp"):
+        for path in directory.glob(pattern):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+
+def store(identity: Any, region: Optional[str], key: Any, value: Any, ttl: float) -> None:
+    path = _path(identity, region, key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _sweep(path.parent, ttl)
+        # write to a temp file and rename so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except (OSError, pickle.PickleError):
+        pass  # caching is best-effort
+
+
+def invalidate(identity: Any, region: Optional[str]) -> None:
+    for path in cache_dir().glob(f"{_scope(identity, region)}-*.pkl"):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def cached(fn: F) -> F:
+    # Caches fn(ctx, ...) on disk for ctx.cache_ttl seconds, keyed by
+    # credential identity (see AwsContext.cache_identity), region, function
+    # and arguments. ctx.use_cache=False bypasses the cache; ctx.refresh skips
+    # the lookup but still stores the fresh result.
+
+    @functools.wraps(fn)
+    def wrapper(ctx, *args, **kwargs):
+        if not ctx.use_cache:
+            return fn(ctx, *args, **kwargs)
+        identity = ctx.cache_identity()
+        key = (fn.__module__, fn.__qualname__, args, sorted(kwargs.items()))
+        if not ctx.refresh:
+            hit = load(identity, ctx.region_name, key, ctx.cache_ttl)
+            if hit is not None:
+                return hit
+        result = fn(ctx, *args, **kwargs)
+        store(identity, ctx.region_name, key, result, ctx.cache_ttl)
+        return result
+
+    return wrapper  # type: ignore[return-value]
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 import click
 from botocore.exceptions import BotoCoreError, ClientError
 
+try:  # optional, faster JSON parsing
+    import orjson as _json
+except ImportError:
+    import json as _json
+
 from .aws import (
     AwsContext,
     allocate_ec2_instance,
@@ -24,6 +29,11 @@ from .aws import (
 from .render import print_error, print_header, print_info, print_table, print_warn
 
 
+def _parse_aws_session(value: str) -> Tuple[Optional[str], Optional[str]]:
+    profile, _, region = value.partition(",")
+    return (profile.strip() or None, region.strip() or None)
+
+
 @click.group()
 @click.option("--profile", envvar="AWS_PROFILE", help="AWS named profile to use")
 @click.option("--region", envvar="AWS_REGION", help="AWS region (overrides profile default)")
@@ -33,14 +43,16 @@ from .render import print_error, print_header, print_info, print_table, print_wa
     show_default=True,
     help="CLI highlight color (e.g., cyan, magenta, green)",
 )
+@click.option("--no-cache", is_flag=True, help="Bypass the on-disk resource listing cache")
+@click.option("--refresh", is_flag=True, help="Ignore cached resource listings and refetch them")
 @click.pass_context
-def cli(ctx: click.Context, profile: Optional[str], region: Optional[str], highlight_color: str):
+def cli(ctx: click.Context, profile: Optional[str], region: Optional[str], highlight_color: str, no_cache: bool, refresh: bool):
     """Cloud Master Manager (cmm)
 
     Manage AWS resources, costs, usage, and CloudFormation deployments via CLI.
     """
     ctx.ensure_object(dict)
-    ctx.obj["aws"] = AwsContext.from_profile(profile, region)
+    ctx.obj["aws"] = AwsContext.from_profile(profile, region, use_cache=not no_cache, refresh=refresh)
     ctx.obj["color"] = highlight_color
 
 
@@ -48,6 +60,58 @@ def cli(ctx: click.Context, profile: Optional[str], region: Optional[str], highl
 # Resources
 # -----------------------------------------------------------------------------
 
+# service -> (table title, warning label, fetcher, columns, row builder),
+# in display order. Keys double as the boto3 client names the fetchers use.
+_RESOURCE_TABLES: Dict[str, Tuple] = {
+    "ec2": (
+        "EC2 Instances",
+        "EC2",
+        list_ec2_instances,
+        [
+            ("InstanceId", None),
+            ("Name", None),
+            ("Type", None),
+            ("State", None),
+            ("AZ", None),
+            ("LaunchTime", None),
+        ],
+        lambda i: [
+            i.get("InstanceId"),
+            i.get("Name"),
+            i.get("InstanceType"),
+            i.get("State"),
+            i.get("AZ"),
+            i.get("LaunchTime"),
+        ],
+    ),
+    "s3": (
+        "S3 Buckets",
+        "S3",
+        list_s3_buckets,
+        [("Name", None), ("Region", None), ("Created", None)],
+        lambda b: [b.get("Name"), b.get("Region"), b.get("CreationDate")],
+    ),
+    "rds": (
+        "RDS Instances",
+        "RDS",
+        list_rds_instances,
+        [("Identifier", None), ("Engine", None), ("Class", None), ("Status", None), ("MultiAZ", None)],
+        lambda d: [d.get("DBInstanceIdentifier"), d.get("Engine"), d.get("DBInstanceClass"), d.get("Status"), d.get("MultiAZ")],
+    ),
+    "lambda": (
+        "Lambda Functions",
+        "Lambda",
+        list_lambda_functions,
+        [("Name", None), ("Runtime", None), ("LastModified", None)],
+        lambda l: [l.get("FunctionName"), l.get("Runtime"), l.get("LastModified")],
+    ),
+}
+
+
+def _session_label(aws: AwsContext) -> str:
+    return f"{aws.session.profile_name}/{aws.region_name}"
+
+
 @cli.group()
 @click.pass_context
 def resources(ctx: click.Context):
@@ -55,94 +119,70 @@ def resources(ctx: click.Context):
 
 
 @resources.command("list")
+@click.option(
+    "--services",
+    default=",".join(_RESOURCE_TABLES),
+    show_default=True,
+    help="Comma-separated services to list",
+)
+@click.option(
+    "--aws-session",
+    "aws_sessions",
+    multiple=True,
+    metavar="PROFILE,REGION",
+    help="Profile and region to list resources from. Repeat for multiple accounts/regions.",
+)
 @click.pass_context
-def list_resources(ctx: click.Context):
+def list_resources(ctx: click.Context, services: str, aws_sessions: Tuple[str, ...]):
     color = ctx.obj["color"]
     aws = ctx.obj["aws"]
+    # Each --aws-session gets its own boto3 session; without any, the listing
+    # uses the global --profile/--region context.
+    contexts: List[AwsContext] = [
+        AwsContext.from_profile(p, r, use_cache=aws.use_cache, refresh=aws.refresh)
+        for p, r in map(_parse_aws_session, aws_sessions)
+    ] or [aws]
+    wanted = {s.strip().lower() for s in services.split(",") if s.strip()}
+    unknown = wanted - _RESOURCE_TABLES.keys()
+    if unknown or not wanted:
+        problem = f"unknown service(s): {', '.join(sorted(unknown))}" if unknown else "no services given"
+        raise click.BadParameter(
+            f"{problem}; choose from {', '.join(_RESOURCE_TABLES)}",
+            param_hint="--services",
+        )
+    tables = {service: spec for service, spec in _RESOURCE_TABLES.items() if service in wanted}
+    tagged = len(contexts) > 1
     print_header("Active Resources", highlight_color=color)
 
     any_resources = False
 
-    # EC2 Instances
-    try:
-        ec2_instances = list_ec2_instances(aws)
-        rows = [
-            [
-                i.get("InstanceId"),
-                i.get("Name"),
-                i.get("InstanceType"),
-                i.get("State"),
-                i.get("AZ"),
-                i.get("LaunchTime"),
-            ]
-            for i in ec2_instances
-            if i.get("State") in {"pending", "running", "stopping", "stopped"}
-        ]
-        if rows:
-            any_resources = True
-            print_table(
-                "EC2 Instances",
-                columns=[
-                    ("InstanceId", None),
-                    ("Name", None),
-                    ("Type", None),
-                    ("State", None),
-                    ("AZ", None),
-                    ("LaunchTime", None),
-                ],
-                rows=rows,
-                highlight_color=color,
-            )
-    except Exception as e:  # broad to avoid CLI crash in missing perms
-        print_warn(f"EC2: {e}")
-
-    # S3 Buckets
-    try:
-        buckets = list_s3_buckets(aws)
-        rows = [[b.get("Name"), b.get("Region"), b.get("CreationDate")] for b in buckets]
-        if rows:
-            any_resources = True
-            print_table(
-                "S3 Buckets",
-                columns=[("Name", None), ("Region", None), ("Created", None)],
-                rows=rows,
-                highlight_color=color,
-            )
-    except Exception as e:
-        print_warn(f"S3: {e}")
-
-    # RDS
-    try:
-        rds = list_rds_instances(aws)
-        rows = [
-            [d.get("DBInstanceIdentifier"), d.get("Engine"), d.get("DBInstanceClass"), d.get("Status"), d.get("MultiAZ")]
-            for d in rds
-        ]
-        if rows:
-            any_resources = True
-            print_table(
-                "RDS Instances",
-                columns=[("Identifier", None), ("Engine", None), ("Class", None), ("Status", None), ("MultiAZ", None)],
-                rows=rows,
-                highlight_color=color,
-            )
-    except Exception as e:
-        print_warn(f"RDS: {e}")
-
-    # Lambda
-    try:
-        lams = list_lambda_functions(aws)
-        rows = [[l.get("FunctionName"), l.get("Runtime"), l.get("LastModified")] for l in lams]
-        if rows:
-            any_resources = True
-            print_table(
-                "Lambda Functions",
-                columns=[("Name", None), ("Runtime", None), ("LastModified", None)],
-                rows=rows,
-                highlight_color=color,
-            )
-    except Exception as e:
-        print_warn(f"Lambda: {e}")
+    for aws in contexts:
+        aws.prewarm(tables)
+
+    # Each fetch is an independent blocking round-trip, so run every
+    # (service, session) pair concurrently and render the tables in the usual
+    # order as their results complete.
+    with ThreadPoolExecutor(max_workers=min(32, len(contexts) * max(len(tables), 1))) as pool:
+        futures = {
+            service: [pool.submit(spec[2], aws) for aws in contexts]
+            for service, spec in tables.items()
+        }
+
+        for service, (title, label, _, columns, to_row) in tables.items():
+            fetched = []
+            for aws, future in zip(contexts, futures[service]):
+                try:
+                    fetched.append((aws, future.result()))
+                except Exception as e:  # broad to avoid CLI crash in missing perms
+                    where = f" ({_session_label(aws)})" if tagged else ""
+                    print_warn(f"{label}{where}: {e}")
+            if tagged:
+                columns = [("Session", None)] + columns
+                rows = ([_session_label(aws)] + to_row(item) for aws, items in fetched for item in items)
+            else:
+                rows = (to_row(item) for _, items in fetched for item in items)
+            if print_table(title, columns=columns, rows=rows, highlight_color=color, hide_empty=True):
+                any_resources = True
 
     if not any_resources:
         print_info("No resource is allocated")
@@ -283,6 +323,13 @@ def deploy(ctx: click.Context):
     """Deploy infrastructure templates."""
 
 
+def _parse_param(p: str) -> Tuple[str, str]:
+    k, sep, v = p.partition("=")
+    if not sep:
+        raise click.ClickException(f"Invalid --param '{p}', expected KEY=VALUE")
+    return k, v
+
+
 @deploy.command("template")
 @click.option("--stack-name", required=True, help="CloudFormation stack name")
 @click.option("--template-file", type=click.Path(exists=True, path_type=Path), required=True, help="Path to .yaml or .json template")
@@ -293,12 +340,13 @@ def deploy_template(ctx: click.Context, stack_name: str, template_file: Path, pa
     aws = ctx.obj["aws"]
     try:
         body = template_file.read_text(encoding="utf-8")
-        parameters: Dict[str, str] = {}
-        for p in params:
-            if "=" not in p:
-                raise click.ClickException(f"Invalid --param '{p}', expected KEY=VALUE")
-            k, v = p.split("=", 1)
-            parameters[k] = v
+        if template_file.suffix.lower() == ".json":
+            # catch malformed JSON locally instead of after a CloudFormation round-trip
+            try:
+                _json.loads(body)
+            except ValueError as e:
+                raise click.ClickException(f"Invalid JSON template '{template_file}': {e}")
+        parameters: Dict[str, str] = dict(map(_parse_param, params))
         stack_id = ensure_stack(
             aws,
             stack_name=stack_name,
@@ -1,14 +1,66 @@
+import csv
+from functools import lru_cache
+from itertools import chain
 from typing import Iterable, Optional, Sequence, Tuple
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.text import Text
 
-console = Console()
+# rich is imported on first output rather than at module load so that
+# `cmm --help` and friends don't pay for it.
+_console = None
+_err_console = None
+
+
+def _get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+
+        _console = Console()
+    return _console
+
+
+def _status_console():
+    # When stdout is piped it carries only headers and CSV tables, so status
+    # lines go to stderr instead of being mixed into the data.
+    global _err_console
+    console = _get_console()
+    if console.is_terminal:
+        return console
+    if _err_console is None:
+        from rich.console import Console
+
+        _err_console = Console(stderr=True)
+    return _err_console
+
+
+@lru_cache(maxsize=None)
+def _title_style(highlight_color: str):
+    from rich.errors import StyleSyntaxError
+    from rich.style import Style
+
+    try:
+        return Style.parse(f"bold {highlight_color}")
+    except StyleSyntaxError:
+        # --highlight-color is free text; don't let a typo break output
+        return Style(bold=True)
+
+
+def _cell(value: object) -> str:
+    # most boto3 fields are already str, so check that first
+    if value.__class__ is str:
+        return value  # type: ignore[return-value]
+    return "" if value is None else str(value)
 
 
 def print_header(title: str, highlight_color: str = "cyan") -> None:
-    console.print(Panel.fit(Text(title, style=f"bold {highlight_color}")))
+    console = _get_console()
+    if not console.is_terminal:
+        # no colors or box drawing survive a pipe, so skip building the panel
+        console.file.write(f"{title}\n")
+        return
+    from rich.panel import Panel
+    from rich.text import Text
+
+    console.print(Panel.fit(Text(title, style=_title_style(highlight_color))))
 
 
 def print_table(
@@ -16,23 +68,62 @@ def print_table(
     columns: Sequence[Tuple[str, Optional[str]]],
     rows: Iterable[Sequence[object]],
     highlight_color: str = "cyan",
-) -> None:
-    table = Table(title=title, title_style=f"bold {highlight_color}", show_lines=False)
+    hide_empty: bool = False,
+) -> int:
+    # rows may be a generator; it is consumed once. Returns the row count and
+    # prints nothing for an empty table when hide_empty is set. When stdout is
+    # not a terminal, rows are written as CSV as they arrive instead of being
+    # laid out by rich.
+    console = _get_console()
+    if not console.is_terminal:
+        return _write_csv(console.file, title, columns, rows, hide_empty)
+
+    from rich.table import Table
+
+    table = Table(title=title, title_style=_title_style(highlight_color), show_lines=False)
     for col_title, justify in columns:
         table.add_column(col_title, justify=justify or "left", overflow="fold")
+    count = 0
     for row in rows:
-        table.add_row(*[str(cell) if cell is not None else "" for cell in row])
-    console.print(table)
+        table.add_row(*map(_cell, row))
+        count += 1
+    if count or not hide_empty:
+        console.print(table)
+    return count
+
+
+def _write_csv(
+    out,
+    title: str,
+    columns: Sequence[Tuple[str, Optional[str]]],
+    rows: Iterable[Sequence[object]],
+    hide_empty: bool,
+) -> int:
+    it = iter(rows)
+    first = next(it, None)
+    if first is None and hide_empty:
+        return 0
+    out.write(f"{title}\n")
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow([col_title for col_title, _ in columns])
+    if first is None:
+        return 0
+    # csv.writer already renders None as an empty field
+    count = 0
+    for row in chain((first,), it):
+        writer.writerow(row)
+        count += 1
+    return count
 
 
 def print_info(message: str) -> None:
-    console.print(f"[bold green]✓[/bold green] {message}")
+    _status_console().print(f"[bold green]✓[/bold green] {message}")
 
 
 def print_warn(message: str) -> None:
-    console.print(f"[bold yellow]![/bold yellow] {message}")
+    _status_console().print(f"[bold yellow]![/bold yellow] {message}")
 
 
 def print_error(message: str) -> None:
-    console.print(f"[bold red]✗[/bold red] {message}")
+    _status_console().print(f"[bold red]✗[/bold red] {message}")
 